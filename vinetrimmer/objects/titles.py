@@ -26,6 +26,13 @@ AUDIO_CODEC_MAP = {
 
 
 class Title:
+    # a season download allocates one Title per episode, so skip the
+    # per-instance __dict__
+    __slots__ = (
+        "id", "type", "name", "year", "season", "episode", "episode_name",
+        "original_lang", "source", "service_data", "quality", "tracks", "filename",
+    )
+
     def __init__(self, id_, type_, name=None, year=None, season=None, episode=None, episode_name=None,
                  original_lang=None, source=None, service_data=None, tracks=None, filename=None):
         self.id = id_
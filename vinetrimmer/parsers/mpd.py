@@ -5,10 +5,11 @@ import json
 import math
 import os
 import re
+import time
 import urllib.parse
 import uuid
 from copy import copy
-from hashlib import md5
+from hashlib import md5, sha1
 
 import requests
 from langcodes import Language
@@ -21,6 +22,36 @@ from vinetrimmer.utils.io import aria2c
 from vinetrimmer.utils.xml import load_xml
 from vinetrimmer.vendor.pymp4.parser import Box
 
+# how long a downloaded manifest may be reused from the on-disk cache
+MANIFEST_CACHE_TTL = 3600
+
+
+def _get_manifest(url, session):
+    """
+    Fetch a manifest, reusing an on-disk copy keyed by the URL hash when it
+    is fresh enough. Repeated runs against the same title (e.g. resumes)
+    skip the round trip entirely.
+    """
+    cache_path = os.path.join(config.directories.cache, "manifests", sha1(url.encode()).hexdigest() + ".mpd")
+    try:
+        if time.time() - os.path.getmtime(cache_path) < MANIFEST_CACHE_TTL:
+            with open(cache_path, "rb") as fd:
+                return fd.read()
+    except OSError:
+        pass
+
+    # keep the body as bytes; lxml parses them directly and we skip
+    # requests' decode-to-str plus load_xml's re-encode round-trip
+    data = (session or requests).get(url).content
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = cache_path + ".tmp"
+    with open(tmp_path, "wb") as fd:
+        fd.write(data)
+    os.replace(tmp_path, cache_path)
+
+    return data
+
 
 def parse(*, url=None, data=None, source, session=None, downloader=None):
     """
@@ -59,7 +90,7 @@ def parse(*, url=None, data=None, source, session=None, downloader=None):
             raise ValueError("Neither a URL nor a document was provided to Tracks.from_mpd")
         base_url = url.rsplit('/', 1)[0] + '/'
         if downloader is None:
-            data = (session or requests).get(url).text
+            data = _get_manifest(url, session)
         elif downloader == "aria2c":
             out = os.path.join(config.directories.temp, url.split("/")[-1])
             asyncio.run(aria2c(url, out))
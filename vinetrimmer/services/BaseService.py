@@ -8,6 +8,12 @@ import requests
 from requests.adapters import HTTPAdapter, Retry
 import random
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 from vinetrimmer.config import config, directories
 from vinetrimmer.utils import try_get
 from vinetrimmer.utils.collections import as_list
@@ -226,6 +232,27 @@ class BaseService(ABC):
 
     # Convenience functions to be used by the inheritor
 
+    @staticmethod
+    def _decode_json(response):
+        """
+        Decode a response body as JSON straight from its bytes.
+        Uses orjson when available, which skips the text-decode step
+        that `response.json()` goes through via stdlib json.
+        """
+        return _json_loads(response.content)
+
+    def _get_json(self, url, **kwargs):
+        """
+        HTTP GET a URL on the service session and decode its JSON body.
+
+        :param url: URL to request.
+        :param kwargs: Any extra arguments to pass to the session's get call.
+        :return: The decoded JSON document.
+        """
+        r = self.session.get(url, **kwargs)
+        r.raise_for_status()
+        return self._decode_json(r)
+
     def parse_title(self, ctx, title):
         title = title or ctx.parent.params.get("title")
         if not title:
@@ -15,7 +15,7 @@ import sys
 from collections.abc import Generator
 from langcodes import Language
 import click
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from vinetrimmer.objects import Title, Tracks, MenuTrack, TextTrack
 from vinetrimmer.services.BaseService import BaseService
 from vinetrimmer.utils.widevine.device import LocalDevice
@@ -116,15 +116,11 @@ class ITV(BaseService):
 
             params = {"refresh": tokens} if tokens else {"refresh": refresh_token}
 
-            r = self.session.get(
-                url='https://auth.prd.user.itv.com/token',
+            tokens = self._get_json(
+                'https://auth.prd.user.itv.com/token',
                 headers=headers,
                 params=params,
             )
-            if r.status_code != 200:
-                raise ConnectionError(f"Failed to refresh tokens: {r.text}")
-
-            tokens = r.json()
             
             with open(tokens_cache_path, "w", encoding="utf-8") as fd:
                 json.dump(tokens, fd)
@@ -146,19 +142,7 @@ class ITV(BaseService):
             (x for x in data.get("seriesList") if x.get("seriesLabel").lower() in ("latest episodes", "other episodes")), None
         ):
             titles = data["seriesList"][0]["titles"]
-            return [Title(
-                        id_=episode["episodeId"],
-                        type_=Title.Types.TV,
-                        name=data["programme"]["title"],
-                        season=episode.get("series") if isinstance(episode.get("series"), int) else 0,
-                        episode=episode.get("episode") if isinstance(episode.get("episode"), int) else 0,
-                        episode_name=episode["episodeTitle"],
-                        source=self.ALIASES[0],
-                        original_lang="en",  # TODO: language detection
-                        service_data=episode,
-                    )
-                    for episode in titles
-                ]
+            return [self._episode_title(episode, data) for episode in titles]
             # Assign episode numbers to special seasons
             counter = 1
             for episode in episodes:
@@ -168,34 +152,11 @@ class ITV(BaseService):
             return Series(episodes)
 
         if kind == "SERIES" and data.get("episode"):
-            episode = data.get("episode")
-            return [Title(
-                        id_=episode["episodeId"],
-                        type_=Title.Types.TV,
-                        name=data["programme"]["title"],
-                        season=episode.get("series") if isinstance(episode.get("series"), int) else 0,
-                        episode=episode.get("episode") if isinstance(episode.get("episode"), int) else 0,
-                        episode_name=episode["episodeTitle"],
-                        source=self.ALIASES[0],
-                        original_lang="en",  # TODO: language detection
-                        service_data=episode,
-                    )
-                ]
+            return [self._episode_title(data.get("episode"), data)]
 
 
         elif kind == "SERIES":
-            episode = data.get("episode")
-            return [Title(
-                        id_=episode["episodeId"],
-                        type_=Title.Types.TV,
-                        name=data["programme"]["title"],
-                        season=episode.get("series") if isinstance(episode.get("series"), int) else 0,
-                        episode=episode.get("episode") if isinstance(episode.get("episode"), int) else 0,
-                        episode_name=episode["episodeTitle"],
-                        source=self.ALIASES[0],
-                        original_lang="en",  # TODO: language detection
-                        service_data=episode,
-                    )
+            return [self._episode_title(episode, data)
                     for series in data["seriesList"]
                     if "Latest episodes" not in series["seriesLabel"]
                     for episode in series["titles"]
@@ -342,22 +303,46 @@ class ITV(BaseService):
 
     # Service specific functions
 
+    def _episode_title(self, episode, data):
+        season = episode.get("series")
+        number = episode.get("episode")
+        return Title(
+            id_=episode["episodeId"],
+            type_=Title.Types.TV,
+            name=data["programme"]["title"],
+            season=season if isinstance(season, int) else 0,
+            episode=number if isinstance(number, int) else 0,
+            episode_name=episode["episodeTitle"],
+            source=self.ALIASES[0],
+            original_lang="en",  # TODO: language detection
+            service_data=episode,
+        )
+
+    # per-process page data cache, keyed by URL (runs are short-lived, never invalidated)
+    _data_cache = {}
+
     def get_data(self, url: str):
         # TODO: Find a proper endpoint for this
 
+        if url in self._data_cache:
+            return self._data_cache[url]
+
         r = self.session.get(url)
         if r.status_code != 200:
             raise ConnectionError(r.text)
 
-        soup = BeautifulSoup(r.text, "html.parser")
-        props = soup.select_one("#__NEXT_DATA__").text
+        # parse the raw bytes (no text decode round-trip) and only the tag we need
+        soup = BeautifulSoup(r.content, "lxml", parse_only=SoupStrainer("script", id="__NEXT_DATA__"))
+        props = soup.find("script", id="__NEXT_DATA__").text
 
         try:
             data = json.loads(props)
         except Exception as e:
             raise ValueError(f"Failed to parse JSON: {e}")
 
-        return data["props"]["pageProps"]
+        data = data["props"]["pageProps"]
+        self._data_cache[url] = data
+        return data
 
     @staticmethod
     def _sanitize(title: str) -> str:
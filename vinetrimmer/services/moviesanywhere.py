@@ -2,7 +2,6 @@ import base64
 import json
 import click
 import re
-from requests import JSONDecodeError
 from httpx import URL
 import uuid
 import xmltodict
@@ -77,8 +76,8 @@ class MoviesAnywhere(BaseService):
         )
 
         try:
-            self.content = res.json()
-        except JSONDecodeError:
+            self.content = self._decode_json(res)
+        except ValueError:
             self.log.exit(" - Not able to return title information")
 
         title_data = self.content["data"]["page"]
@@ -159,7 +158,8 @@ class MoviesAnywhere(BaseService):
 
         tracks.add(corrected_video_list)
         tracks.audios = audios
-        tracks.videos = [x for x in tracks.videos if (x.codec or "")[:3] in self.VIDEO_CODEC_MAP[self.vcodec]]
+        allowed_codecs = tuple(self.VIDEO_CODEC_MAP[self.vcodec])
+        tracks.videos = [x for x in tracks.videos if (x.codec or "").startswith(allowed_codecs)]
 
         return tracks
 
@@ -1,14 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 import base64
 import re
+import ssl
 import tempfile
 import os
 from collections.abc import Generator
 from typing import Any, Union
-from urllib.parse import urlparse, urlunparse
 from vinetrimmer.utils.sslciphers import SSLCiphers
 import click
+import httpx
 import requests
 from click import Context
 from vinetrimmer.objects import Title, Tracks
@@ -52,9 +54,16 @@ class MY5(BaseService):
         super().__init__(ctx)
         self.title = title
         self.license_api = None
+        self._asset_ids = []
+        self._playlists = {}
 
         self.session.headers.update({"user-agent": self.config["user_agent"]})
 
+        # one adapter instance for both schemes, so they share a connection pool
+        adapter = SSLCiphers()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
 
 
     def get_titles(self):
@@ -63,15 +72,13 @@ class MY5(BaseService):
             raise ValueError("Could not parse ID from title - is the URL correct?")
 
         if season and episode:
-            r = self.session.get(
+            episode = self._get_json(
                 self.config["endpoints"]["single"].format(
                     show=title,
                     season=season,
                     episode=episode,
                 )
             )
-            r.raise_for_status()
-            episode = r.json()
 
             return [Title(
                 id_=episode.get("id"),
@@ -85,9 +92,7 @@ class MY5(BaseService):
                 )]
 
 
-        r = self.session.get(self.config["endpoints"]["episodes"].format(show=title))
-        r.raise_for_status()
-        data = r.json()
+        data = self._get_json(self.config["endpoints"]["episodes"].format(show=title))
 
         if data["episodes"][0]["genre"] == "Film":
             return [Title(
@@ -104,7 +109,7 @@ class MY5(BaseService):
                 ]
 
         else:
-            return [Title(
+            titles = [Title(
                 id_=episode.get("id"),
                 type_=Title.Types.TV,
                 name=episode.get("sh_title"),
@@ -115,9 +120,9 @@ class MY5(BaseService):
                 episode_name=episode.get("title")
                 #language="en",  # TODO: don't assume
                     )for episode in data["episodes"]]
-                    
-                    
-                    
+            # remember the season's asset IDs so get_playlist can batch its auth calls
+            self._asset_ids = [x.id for x in titles]
+            return titles
 
 
     def get_tracks(self, title):
@@ -151,16 +156,23 @@ class MY5(BaseService):
     # Service specific functions
 
     def get_playlist(self, asset_id: str) -> tuple:
-        session = self.session
-        for prefix in ("https://", "http://"):
-            session.mount(prefix, SSLCiphers())
-
-        cert_binary = base64.b64decode(self.config["certificate"])
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pem") as cert_file:
-            cert_file.write(cert_binary)
-            cert_path = cert_file.name
+        if asset_id not in self._playlists and len(self._asset_ids) > 1:
+            missing = [x for x in self._asset_ids if x not in self._playlists]
+            try:
+                asyncio.run(self._fetch_playlists(missing))
+            except Exception as e:
+                self.log.warning(f" - Batched playlist fetch failed ({e}), requesting per title instead")
+            finally:
+                # one batch attempt per season; anything still missing falls
+                # back to (cached) per-title requests below
+                self._asset_ids = []
+
+        if asset_id in self._playlists:
+            return self._playlists[asset_id]
+
+        cert_path = self._write_cert()
         try:
-            r = session.get(url=self.config["endpoints"]["auth"].format(title_id=asset_id), cert=cert_path)
+            r = self.session.get(url=self.config["endpoints"]["auth"].format(title_id=asset_id), cert=cert_path)
         except requests.RequestException as e:
             if "Max retries exceeded" in str(e):
                 raise ConnectionError(
@@ -171,7 +183,46 @@ class MY5(BaseService):
         finally:
             os.remove(cert_path)
 
-        data = r.json()
+        playlist = self._parse_playlist(self._decode_json(r))
+        self._playlists[asset_id] = playlist
+        return playlist
+
+    async def _fetch_playlists(self, asset_ids: list) -> None:
+        """
+        Fetch the auth endpoint for every asset of the season concurrently over
+        one client, instead of paying connection setup per get_tracks call.
+        """
+        ctx = ssl.create_default_context()
+        ctx.check_hostname = False
+        ctx.set_ciphers("DEFAULT:@SECLEVEL=0")
+
+        cert_path = self._write_cert()
+        try:
+            async with httpx.AsyncClient(
+                verify=ctx,
+                cert=cert_path,
+                headers={"user-agent": self.config["user_agent"]},
+            ) as client:
+                responses = await asyncio.gather(*[
+                    client.get(self.config["endpoints"]["auth"].format(title_id=asset_id))
+                    for asset_id in asset_ids
+                ])
+        finally:
+            os.remove(cert_path)
+
+        # store every good response before surfacing an error, so one bad
+        # asset doesn't throw away the rest of the batch
+        error = None
+        for asset_id, r in zip(asset_ids, responses):
+            try:
+                r.raise_for_status()
+                self._playlists[asset_id] = self._parse_playlist(self._decode_json(r))
+            except Exception as e:
+                error = error or e
+        if error:
+            raise error
+
+    def _parse_playlist(self, data: dict) -> tuple:
         if not data.get("assets"):
             raise ValueError(f"Could not find asset: {data}")
 
@@ -180,10 +231,15 @@ class MY5(BaseService):
         mpd_url = rendition["url"]
         lic_url = asset["keyserver"]
 
-        parse = urlparse(mpd_url)
-        path = parse.path.split("/")
-        path[-1] = path[-1].split("-")[0].split("_")[0]
-        manifest = urlunparse(parse._replace(path="/".join(path)))
+        # strip the filename down to its bare name, no structured parse round-trip needed
+        base, _, filename = mpd_url.rpartition("/")
+        manifest = f"{base}/{filename.split('-')[0].split('_')[0]}"
         manifest += ".mpd" if not manifest.endswith("mpd") else ""
 
         return manifest, lic_url
+
+    def _write_cert(self) -> str:
+        cert_binary = base64.b64decode(self.config["certificate"])
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".pem") as cert_file:
+            cert_file.write(cert_binary)
+            return cert_file.name
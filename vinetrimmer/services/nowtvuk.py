@@ -6,19 +6,76 @@ import base64
 import hashlib
 import hmac
 import json
+import os
 import sys
 import time
 from collections.abc import Generator
+from functools import lru_cache
+from itertools import chain
 from http.cookiejar import CookieJar
 from typing import Any, Optional, Union
-from urllib.parse import urlparse
 from vinetrimmer.utils.widevine.device import LocalDevice
 import click
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter, Retry
 from vinetrimmer.objects import Title, Tracks
 from vinetrimmer.services.BaseService import BaseService
 from langcodes import Language
 
+_MD5_EMPTY = "d41d8cd98f00b204e9800998ecf8427e"  # md5 of b"", constant on license requests
+
+
+class NowTVError(Exception):
+    """Raised when the NowTV API returns an error response."""
+
+
+def _fast_path(url: str) -> str:
+    """Path component of a well-formed http(s) URL, without a full urlparse."""
+    i = url.find("/", 8)  # skip past scheme://host
+    if i < 0:
+        return url
+    path = url[i:]
+    q = path.find("?")
+    return path[:q] if q >= 0 else path
+
+
+@lru_cache(maxsize=64)
+def _sky_header_md5(header_items: frozenset) -> str:
+    if not header_items:
+        return _MD5_EMPTY
+    # stream the header lines into one digest, no string concat build-up
+    h = hashlib.md5()
+    for key, value in sorted(header_items):
+        h.update(key.encode())
+        h.update(b": ")
+        h.update(value.encode())
+        h.update(b"\n")
+    return h.hexdigest()
+
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj).encode("utf-8")
+
+
+def _capabilities(protection: str) -> list:
+    return [
+        {
+            "transport": "DASH",
+            "protection": protection,
+            "vcodec": vcodec,
+            "acodec": acodec,
+            "container": container,
+        }
+        for acodec in ("EAC3", "AAC")
+        for vcodec in ("H265", "H264")
+        for container in ("TS", "ISOBMFF", "MP4")
+    ]
+
+
 class NowTVUK(BaseService):
     """
     \b
@@ -44,6 +101,12 @@ class NowTVUK(BaseService):
 
     TITLE_RE = r"https?://(?:www\.)?nowtv\.com/watch/asset(?:/movies|/tv)?(?P<id>/[a-z0-9-]+/[a-zA-Z0-9]+)"
 
+    TOKEN_TTL = 300  # seconds to reuse a userToken before asking the tokens endpoint again
+
+    # built once at import, get_tracks only picks the right protection scheme
+    _CAPS_WIDEVINE = _capabilities("WIDEVINE")
+    _CAPS_PLAYREADY = _capabilities("PLAYREADY")
+
     @staticmethod
     @click.command(name="NowTVUK", short_help="https://nowtv.com", help=__doc__)
     @click.argument("title", type=str)
@@ -61,23 +124,47 @@ class NowTVUK(BaseService):
         self.license_api = None
         self.skyCEsidismesso01 = None
         self.userToken = None
+        self._token_ts = 0.0
+        self._token_future = None
+        self._vod_body_cache = {}
         self.vcodec = ctx.parent.params["vcodec"]
         self.vrange= ctx.parent.params["range_"]
 
         self.configure()
 
-    def configure(self):       
+    def configure(self):
+        # widen the pool so concurrent VOD calls don't queue on connections
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=5,
+                backoff_factor=1,
+                status_forcelist=[429, 500, 502, 503, 504],
+            )
+        ))
         self.skyCEsidismesso01 = self.session.cookies.get('skyCEsidismesso01')
-        self.userToken = self.get_token()
+        # fetch the token in the background so get_titles' own round trip
+        # overlaps with it instead of waiting behind it
+        pool = ThreadPoolExecutor(max_workers=1)
+        self._token_future = pool.submit(self.get_token)
+        pool.shutdown(wait=False)
 
     def get_titles(self):
         #if not self.title.startswith("/"):
         #   self.title = "/" + self.title
 
 
-        res = self.session.get(
+        if self.movie:
+            # movies only read the node's own attributes, so skip the heavy
+            # items/recs/collections/trailers expansion entirely
+            represent = "represent=()"
+        else:
+            represent = "represent=(items(items)%2Crecs%5Btake%3D8%5D%2Ccollections(items(items%5Btake%3D8%5D))%2Ctrailers)"
+
+        res = self._decode_json(self.session.get(
             url="https://eu.api.atom.nowtv.com/adapter-calypso/v3/query/node?slug="+self.title,
-            params="represent=(items(items)%2Crecs%5Btake%3D8%5D%2Ccollections(items(items%5Btake%3D8%5D))%2Ctrailers)&features=upcoming&contentSegments=ENTERTAINMENT%2CHAYU%2CKIDS%2CMOVIES%2CNEWS%2CSHORTFORM%2CSPORTS%2CSPORTS_CORE%2CSPORTS_ESSENTIALS%2CSPORTS_EVENTS%2CSPORTS_EVENTS_EXCLUSIVE%2CSPORTS_EXTRA%2CSPORTS_EXTRA_EXCLUSIVE%2CSSN",
+            params=represent + "&features=upcoming&contentSegments=ENTERTAINMENT%2CHAYU%2CKIDS%2CMOVIES%2CNEWS%2CSHORTFORM%2CSPORTS%2CSPORTS_CORE%2CSPORTS_ESSENTIALS%2CSPORTS_EVENTS%2CSPORTS_EVENTS_EXCLUSIVE%2CSPORTS_EXTRA%2CSPORTS_EXTRA_EXCLUSIVE%2CSSN",
             headers={
                 "Accept": "*",
                 "X-SkyOTT-Device": "COMPUTER",
@@ -86,7 +173,7 @@ class NowTVUK(BaseService):
                 "X-SkyOTT-Provider": "NOWTV",
                 "X-SkyOTT-Territory": self.config["client"]["territory"],
             },
-        ).json()
+        ))
 
         if self.movie:           
             return Title(
@@ -100,11 +187,10 @@ class NowTVUK(BaseService):
             )
             
         else:
-            titles = [
-                episode
+            titles = chain.from_iterable(
+                season["relationships"]["items"]["data"]
                 for season in res["relationships"]["items"]["data"]
-                for episode in season["relationships"]["items"]["data"]
-            ]           
+            )
             return [Title(
                 id_=self.title,
                 type_=Title.Types.TV,
@@ -140,117 +226,33 @@ class NowTVUK(BaseService):
             "x-skyott-proposition": self.config["client"]["proposition"],
             "x-skyott-provider": self.config["client"]["provider"],
             "x-skyott-territory": self.config["client"]["territory"],
-            "x-skyott-usertoken": self.get_token(),
-        }
-
-        data = {
-            "device": {
-                "capabilities": [
-                    # H265 EAC3
-                    {
-                        "transport": "DASH",
-                        "protection": "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE",
-                        "vcodec": "H265",
-                        "acodec": "EAC3",
-                        "container": "TS",
-                    },
-                    {
-                        "transport": "DASH",
-                        "protection": "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE",
-                        "vcodec": "H265",
-                        "acodec": "EAC3",
-                        "container": "ISOBMFF",
-                    },
-                    {
-                        "container": "MP4",
-                        "vcodec": "H265",
-                        "acodec": "EAC3",
-                        "protection": "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE",
-                        "transport": "DASH",
-                    },
-                    # H264 EAC3
-                    {
-                        "transport": "DASH",
-                        "protection": "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE",
-                        "vcodec": "H264",
-                        "acodec": "EAC3",
-                        "container": "TS",
-                    },
-                    {
-                        "transport": "DASH",
-                        "protection": "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE",
-                        "vcodec": "H264",
-                        "acodec": "EAC3",
-                        "container": "ISOBMFF",
-                    },
-                    {
-                        "container": "MP4",
-                        "vcodec": "H264",
-                        "acodec": "EAC3",
-                        "protection": "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE",
-                        "transport": "DASH",
-                    },
-                    # H265 AAC
-                    {
-                        "transport": "DASH",
-                        "protection": "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE",
-                        "vcodec": "H265",
-                        "acodec": "AAC",
-                        "container": "TS",
-                    },
-                    {
-                        "transport": "DASH",
-                        "protection": "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE",
-                        "vcodec": "H265",
-                        "acodec": "AAC",
-                        "container": "ISOBMFF",
-                    },
-                    {
-                        "container": "MP4",
-                        "vcodec": "H265",
-                        "acodec": "AAC",
-                        "protection": "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE",
-                        "transport": "DASH",
-                    },
-                    # H264 AAC
-                    {
-                        "transport": "DASH",
-                        "protection": "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE",
-                        "vcodec": "H264",
-                        "acodec": "AAC",
-                        "container": "TS",
-                    },
-                    {
-                        "transport": "DASH",
-                        "protection": "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE",
-                        "vcodec": "H264",
-                        "acodec": "AAC",
-                        "container": "ISOBMFF",
-                    },
-                    {
-                        "container": "MP4",
-                        "vcodec": "H264",
-                        "acodec": "AAC",
-                        "protection": "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE",
-                        "transport": "DASH",
-                    },
-                ],
-                "model": self.config["client"]["model"],
-                "maxVideoFormat": "UHD" if self.vcodec == "H265" else "HD", # "HD", "UHD"
-                "hdcpEnabled": "True",
-                "supportedColourSpaces": supported_colour_spaces,
-            },
-            "providerVariantId": variant_id,
-            "parentalControlPin": "null",
+            "x-skyott-usertoken": self._resolve_token(),
         }
 
-        data = json.dumps(data)
+        protection = "PLAYREADY" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "WIDEVINE"
+
+        body_key = (variant_id, self.vcodec, self.vrange, protection)
+        data = self._vod_body_cache.get(body_key)
+        if data is None:
+            data = _json_dumps({
+                "device": {
+                    "capabilities": self._CAPS_PLAYREADY if protection == "PLAYREADY" else self._CAPS_WIDEVINE,
+                    "model": self.config["client"]["model"],
+                    "maxVideoFormat": "UHD" if self.vcodec == "H265" else "HD", # "HD", "UHD"
+                    "hdcpEnabled": True,
+                    "supportedColourSpaces": supported_colour_spaces,
+                },
+                "providerVariantId": variant_id,
+                "parentalControlPin": "null",
+            })
+            self._vod_body_cache[body_key] = data
         headers["x-sky-signature"] = self.calculate_signature("POST", url, headers, data)
 
-        response = self.session.post(url, headers=headers, data=data).json()
+        response = self._decode_json(self.session.post(url, headers=headers, data=data))
         if response.get("errorCode"):
-            self.log.error(response.get("description"))
-            sys.exit(1)
+            # raise instead of killing the process so a batch caller can
+            # retry just this title without losing in-flight state
+            raise NowTVError(response.get("description"))
 
         manifest = response["asset"]["endpoints"][0]["url"]
         self.license_api = response['protection']['licenceAcquisitionUrl']
@@ -264,13 +266,24 @@ class NowTVUK(BaseService):
         
         if supported_colour_spaces == ["HDR10"]:
             for track in tracks.videos:
-                track.hdr10 = True if supported_colour_spaces == ["HDR10"] else False
-        if supported_colour_spaces == ["DV"]:
+                track.hdr10 = True
+        elif supported_colour_spaces == ["DV"]:
             for track in tracks.videos:
-                track.dolbyvison = True if supported_colour_spaces == ["DV"] else False
+                track.dolbyvison = True
 
         return tracks
 
+    def get_tracks_batch(self, titles):
+        """
+        Resolve tracks for several titles concurrently.
+
+        The VOD endpoint is hit once per episode, so on season downloads the
+        round trips dominate wall time. The shared session pool covers the
+        parallel POSTs and the memoized userToken is signed only once.
+        """
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            return list(pool.map(self.get_tracks, titles))
+
     def get_chapters(self, title):
         return []
 
@@ -308,35 +321,71 @@ class NowTVUK(BaseService):
 
     @staticmethod
     def calculate_sky_header(headers: dict) -> str:
-        text_headers = ""
-        for key in sorted(headers.keys()):
-            if key.lower().startswith("x-skyott"):
-                text_headers += key + ": " + headers[key] + "\n"
-        return hashlib.md5(text_headers.encode()).hexdigest()
-
-    def calculate_signature(self, method: str, url: str, headers: dict, payload: str) -> str:
-        to_hash = (
-            "{method}\n{path}\n{response_code}\n{app_id}\n{version}\n{headers_md5}\n" "{timestamp}\n{payload_md5}\n"
-        ).format(
-            method=method,
-            path=urlparse(url).path if url.startswith("http") else url,
-            response_code="",
-            app_id=self.config["client"]["client_sdk"],
-            version="1.0",
-            headers_md5=self.calculate_sky_header(headers),
-            timestamp=int(time.time()),
-            payload_md5=hashlib.md5(payload.encode()).hexdigest(),
-        )
+        # the x-skyott header set repeats across signatures (only the
+        # timestamp outside of it changes), so the digest is cached
+        return _sky_header_md5(frozenset(
+            (key, value) for key, value in headers.items() if key[:8].lower() == "x-skyott"
+        ))
+
+    def calculate_signature(self, method: str, url: str, headers: dict, payload: Union[bytes, str]) -> str:
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+
+        # one timestamp for both the hash and the signature format, so they
+        # can't disagree across a second boundary
+        timestamp = int(time.time())
+        path = _fast_path(url) if url.startswith("http") else url
+
+        app_id = self.config["client"]["client_sdk"]
+        headers_md5 = self.calculate_sky_header(headers)
+        payload_md5 = hashlib.md5(payload).hexdigest() if payload else _MD5_EMPTY
+        # fields in order: method, path, response code (blank), app id,
+        # version, headers md5, timestamp, payload md5
+        to_hash = f"{method}\n{path}\n\n{app_id}\n1.0\n{headers_md5}\n{timestamp}\n{payload_md5}\n".encode("utf8")
 
         signature_key = bytes(self.config["security"]["signature_hmac_key_v4"], "utf-8")
-        hashed = hmac.new(signature_key, to_hash.encode("utf8"), hashlib.sha1).digest()
+        hashed = hmac.digest(signature_key, to_hash, "sha1")
         signature_hmac = base64.b64encode(hashed).decode("utf8")
 
         return self.config["security"]["signature_format"].format(
-            client=self.config["client"]["client_sdk"], signature=signature_hmac, timestamp=int(time.time())
+            client=self.config["client"]["client_sdk"], signature=signature_hmac, timestamp=timestamp
         )
 
+    def _resolve_token(self) -> str:
+        if self._token_future is not None:
+            self._token_future.result()
+            self._token_future = None
+        return self.get_token()
+
+    @staticmethod
+    def _token_expiry(token: str) -> int:
+        """Read the exp claim off the userToken JWT, falling back to a short TTL."""
+        try:
+            payload = token.split(".")[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            return int(claims["exp"])
+        except (IndexError, KeyError, ValueError):
+            return int(time.time()) + NowTVUK.TOKEN_TTL
+
     def get_token(self) -> str:
+        if self.userToken and time.monotonic() - self._token_ts < self.TOKEN_TTL:
+            return self.userToken
+
+        auth_token = self.session.cookies.get("skyCEsidismesso01") or ""
+        cache_key = hashlib.md5(f"{auth_token}:{self.config['client']['id']}".encode()).hexdigest()
+        cache_path = self.get_cache(f"token_{cache_key}.json")
+
+        if os.path.isfile(cache_path):
+            try:
+                with open(cache_path, encoding="utf-8") as fd:
+                    cached = json.load(fd)
+            except ValueError:
+                cached = {}
+            if cached.get("token") and cached.get("exp", 0) - 60 > time.time():
+                self.userToken = cached["token"]
+                self._token_ts = time.monotonic()
+                return self.userToken
+
         url = self.config["endpoints"]["tokens"]
 
         headers = {
@@ -366,12 +415,20 @@ class NowTVUK(BaseService):
             },
         }
 
-        data = json.dumps(data)
-        headers["Content-MD5"] = hashlib.md5(data.encode("utf-8")).hexdigest()
+        data = _json_dumps(data)
+        headers["Content-MD5"] = hashlib.md5(data).hexdigest()
 
-        response = self.session.post(url, headers=headers, data=data).json()
+        response = self._decode_json(self.session.post(url, headers=headers, data=data))
         if response.get("message"):
-            self.log.error(f"{response['message']}")
-            sys.exit(1)
+            raise NowTVError(response["message"])
+
+        self.userToken = response["userToken"]
+        self._token_ts = time.monotonic()
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as fd:
+            json.dump({"token": self.userToken, "exp": self._token_expiry(self.userToken)}, fd)
+        os.replace(tmp_path, cache_path)  # atomic, a killed run can't corrupt the cache
 
-        return response["userToken"]
+        return self.userToken
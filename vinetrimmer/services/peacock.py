@@ -219,10 +219,10 @@ class Peacock(BaseService):
         
         if supported_colour_spaces == ["HDR10"]:
             for track in tracks.videos:
-                track.hdr10 = True if supported_colour_spaces == ["HDR10"] else False
+                track.hdr10 = True
         if supported_colour_spaces == ["DolbyVision"]:
             for track in tracks.videos:
-                track.dolbyvison = True if supported_colour_spaces == ["DV"] else False
+                track.dolbyvison = True
 
         for track in tracks:
             track.needs_proxy = False
@@ -1,16 +1,19 @@
 from __future__ import annotations
 
-import os
 import base64
-import datetime
 import hashlib
 import hmac
+import io
 import re
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
 import click
 from requests.exceptions import HTTPError
 
-from vinetrimmer.config import config, directories
+from vinetrimmer.config import config
 from vinetrimmer.objects import TextTrack, Title, Tracks
 from vinetrimmer.services.BaseService import BaseService
 from copy import copy
@@ -21,6 +24,13 @@ import requests
 from requests.adapters import HTTPAdapter, Retry
 from vinetrimmer.utils.widevine.device import LocalDevice
 
+
+@lru_cache(maxsize=64)
+def _sign(token, path, query):
+    """Signing is deterministic, so repeats (e.g. retries) hit the cache."""
+    return base64.urlsafe_b64encode(hmac.digest(token, f"POST{path}{query}".encode(), "sha1")).decode("utf-8")
+
+
 class RakutenTV(BaseService):
     """
     Service code for Rakuten's Rakuten TV streaming service (https://rakuten.tv).
@@ -37,7 +47,7 @@ class RakutenTV(BaseService):
     """
 
     ALIASES = ["RKTN", "rakuten", "rakutentv"]
-    TITLE_RE = r"^(?:https?://(?:www\.)?rakuten\.tv/([a-z]+/|)movies(?:/[a-z]{2})?/)(?P<id>[a-z0-9-]+)"
+    TITLE_RE = re.compile(r"^(?:https?://(?:www\.)?rakuten\.tv/([a-z]+/|)movies(?:/[a-z]{2})?/)(?P<id>[a-z0-9-]+)")
 
     @staticmethod
     @click.command(name="RakutenTV", short_help="rakuten.tv")
@@ -85,19 +95,18 @@ class RakutenTV(BaseService):
 
     def get_titles(self):
         self.pair_device()
+        client = self.config["clients"][self.device]
         title_url = self.config["endpoints"]["title"].format(
             title_id=self.title
         ) + urllib.parse.urlencode(
             {
                 "classification_id": self.classification_id,
-                "device_identifier": self.config["clients"][self.device][
-                    "device_identifier"
-                ],
-                "device_serial": self.config["clients"][self.device]["device_serial"],
+                "device_identifier": client["device_identifier"],
+                "device_serial": client["device_serial"],
                 "locale": self.locale,
                 "market_code": self.market_code,
                 "session_uuid": self.session_uuid,
-                "timestamp": f"{int(datetime.datetime.now().timestamp())}005",
+                "timestamp": f"{int(time.time())}005",
             }
         )
 
@@ -152,40 +161,32 @@ class RakutenTV(BaseService):
             source=self.ALIASES[0],
         )
 
-        subtitle_tracks = []
-        for subtitle in stream_info.get("all_subtitles"):
+        # one pass over all_subtitles; vtt is only the fallback when no srt exists
+        srt_tracks = []
+        vtt_tracks = []
+        for subtitle in stream_info.get("all_subtitles") or ():
             if subtitle["format"] == "srt":
-                subtitle_tracks += [
-                    TextTrack(
-                        id_=hashlib.md5(subtitle["url"].encode()).hexdigest()[0:6],
-                        source=self.ALIASES[0],
-                        url=subtitle["url"],
-                        # metadata
-                        codec="srt",
-                        forced=subtitle["forced"],
-                        language=subtitle["locale"],
-                    )
-                ]
-
-        tracks.add(subtitle_tracks)
-
-        if not tracks.subtitles:
-            subtitle_tracks = []
-            for subtitle in stream_info.get("all_subtitles"):
-                if subtitle["format"] == "['vtt']":
-                    subtitle_tracks += [
-                        TextTrack(
-                            id_=hashlib.md5(subtitle["url"].encode()).hexdigest()[0:6],
-                            source=self.ALIASES[0],
-                            url=subtitle["url"].replace("['vtt']", "vtt"),
-                            # metadata
-                            codec="vtt",
-                            forced=subtitle["forced"],
-                            language=subtitle["locale"],
-                        )
-                    ]
-
-            tracks.add(subtitle_tracks)
+                srt_tracks.append(TextTrack(
+                    id_=hashlib.blake2s(subtitle["url"].encode(), digest_size=3).hexdigest(),
+                    source=self.ALIASES[0],
+                    url=subtitle["url"],
+                    # metadata
+                    codec="srt",
+                    forced=subtitle["forced"],
+                    language=subtitle["locale"],
+                ))
+            elif subtitle["format"] == "['vtt']":
+                vtt_tracks.append(TextTrack(
+                    id_=hashlib.blake2s(subtitle["url"].encode(), digest_size=3).hexdigest(),
+                    source=self.ALIASES[0],
+                    url=subtitle["url"].replace("['vtt']", "vtt"),
+                    # metadata
+                    codec="vtt",
+                    forced=subtitle["forced"],
+                    language=subtitle["locale"],
+                ))
+
+        tracks.add(srt_tracks or vtt_tracks)
 
         #self.append_tracks(tracks)
 
@@ -202,44 +203,28 @@ class RakutenTV(BaseService):
         return self.config["certificate"]
 
     def license(self, challenge, **_):
-        if self.playready:
-            res = self.session.post(
-                url=self.license_url,
-                data=challenge,
-            )
-
-            if "errors" in res.text:
-                res = res.json()
-                if res["errors"][0]["message"] == "HttpException: Forbidden":
-                    self.log.exit(
-                        " x This CDM is not eligible to decrypt this\n"
-                        "   content or has been blacklisted by RakutenTV"
-                    )
-                elif res["errors"][0]["message"] == "HttpException: An error happened":
-                    self.log.exit(
-                        " x This CDM seems to be revoked and\n"
-                        "   therefore it can't decrypt this content",
-                    )
-            return res.content
-        else:
-            res = self.session.post(
-                url=self.license_url,
-                data=challenge,
-            )
+        # identical for PlayReady and Widevine; the endpoint comes from the
+        # stream info either way
+        res = self.session.post(
+            url=self.license_url,
+            data=challenge,
+        )
 
-            if "errors" in res.text:
-                res = res.json()
-                if res["errors"][0]["message"] == "HttpException: Forbidden":
-                    self.log.exit(
-                        " x This CDM is not eligible to decrypt this\n"
-                        "   content or has been blacklisted by RakutenTV"
-                    )
-                elif res["errors"][0]["message"] == "HttpException: An error happened":
-                    self.log.exit(
-                        " x This CDM seems to be revoked and\n"
-                        "   therefore it can't decrypt this content",
-                    )
-            return res.content
+        # a successful response is a binary license blob; only decode when
+        # the server actually answered with json
+        if res.headers.get("Content-Type", "").startswith("application/json") and "errors" in res.text:
+            res = res.json()
+            if res["errors"][0]["message"] == "HttpException: Forbidden":
+                self.log.exit(
+                    " x This CDM is not eligible to decrypt this\n"
+                    "   content or has been blacklisted by RakutenTV"
+                )
+            elif res["errors"][0]["message"] == "HttpException: An error happened":
+                self.log.exit(
+                    " x This CDM seems to be revoked and\n"
+                    "   therefore it can't decrypt this content",
+                )
+        return res.content
 
     # Service specific functions
 
@@ -250,64 +235,57 @@ class RakutenTV(BaseService):
                 "User-Agent": "Mozilla/5.0 (Linux; Android 11; SHIELD Android TV Build/RQ1A.210105.003; wv) AppleWebKit/537.36 (KHTML, like Gecko) Version/4.0 Chrome/99.0.4844.88 Mobile Safari/537.36",
             }
         )
+        # size the pool for the append_tracks probe burst so every request
+        # from login through the ~100 HEADs reuses the same keep-alive pool
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=5,
+                backoff_factor=1,
+                status_forcelist=[429, 500, 502, 503, 504],
+            )
+        ))
+        # the manifest paths are constants from config, so parse them once here
+        # instead of running urlparse on every signed request
+        self.manifest_paths = {
+            kind: urllib.parse.urlparse(self.config["endpoints"]["manifest"].format(kind=kind)).path
+            for kind in ("avod", "me")
+        }
+        # prewarm DNS + TCP + TLS so pair_device doesn't pay the full
+        # handshake; the pooled connection is reused for the real requests
+        try:
+            self.session.head(self.config["endpoints"]["auth"], timeout=5)
+        except requests.RequestException:
+            pass
 
-    def generate_signature(self, url):
-        up = urllib.parse.urlparse(url)
-        digester = hmac.new(
-            self.access_token.encode(),
-            f"POST{up.path}{up.query}".encode(),
-            hashlib.sha1,
-        )
-        return (
-            base64.b64encode(digester.digest())
-            .decode("utf-8")
-            .replace("+", "-")
-            .replace("/", "_")
-        )
+    def generate_signature(self, path, query):
+        return _sign(self.access_token_bytes, path, query)
 
     def pair_device(self):
         # TODO: Make this return the tokens, move print out of the func
         # log.info_("Logging into RakutenTV as an Android device")
         if not self.credentials:
             self.log.exit(" - No credentials provided, unable to log in.")
+        client = self.config["clients"][self.device]
         try:
             res = self.session.post(
                 url=self.config["endpoints"]["auth"],
-                params={
-                    "device_identifier": self.config["clients"][self.device][
-                        "device_identifier"
-                    ]
-                },
+                params={"device_identifier": client["device_identifier"]},
                 data={
-                    "app_version": self.config["clients"][self.device]["app_version"],
-                    "device_metadata[uid]": self.config["clients"][self.device][
-                        "device_serial"
-                    ],
-                    "device_metadata[os]": self.config["clients"][self.device][
-                        "device_os"
-                    ],
-                    "device_metadata[model]": self.config["clients"][self.device][
-                        "device_model"
-                    ],
-                    "device_metadata[year]": self.config["clients"][self.device][
-                        "device_year"
-                    ],
-                    "device_serial": self.config["clients"][self.device][
-                        "device_serial"
-                    ],
+                    "app_version": client["app_version"],
+                    "device_metadata[uid]": client["device_serial"],
+                    "device_metadata[os]": client["device_os"],
+                    "device_metadata[model]": client["device_model"],
+                    "device_metadata[year]": client["device_year"],
+                    "device_serial": client["device_serial"],
                     "device_metadata[trusted_uid]": False,
-                    "device_metadata[brand]": self.config["clients"][self.device][
-                        "device_brand"
-                    ],
+                    "device_metadata[brand]": client["device_brand"],
                     "classification_id": 69,
                     "user[password]": self.credentials.password,
-                    "device_metadata[app_version]": self.config["clients"][self.device][
-                        "app_version"
-                    ],
+                    "device_metadata[app_version]": client["app_version"],
                     "user[username]": self.credentials.username,
-                    "device_metadata[serial_number]": self.config["clients"][
-                        self.device
-                    ]["device_serial"],
+                    "device_metadata[serial_number]": client["device_serial"],
                 },
             ).json()
         except HTTPError as e:
@@ -323,6 +301,7 @@ class RakutenTV(BaseService):
             else:
                 self.log.exit(f" - Login failed: {error['message']} [{error['code']}]")
         self.access_token = res["data"]["user"]["access_token"]
+        self.access_token_bytes = self.access_token.encode()
         self.ifa_subscriber_id = res["data"]["user"]["avod_profile"][
             "ifa_subscriber_id"
         ]
@@ -371,44 +350,41 @@ class RakutenTV(BaseService):
         return title
 
     def get_avod(self):
-        stream_info_url = self.config["endpoints"]["manifest"].format(
-            kind="avod"
-        ) + urllib.parse.urlencode(
+        client = self.config["clients"][self.device]
+        query = urllib.parse.urlencode(
             {
                 "device_stream_video_quality": self.resolution,
-                "device_identifier": self.config["clients"][self.device][
-                    "device_identifier"
-                ],
+                "device_identifier": client["device_identifier"],
                 "market_code": self.market_code,
                 "session_uuid": self.session_uuid,
-                "timestamp": f"{int(datetime.datetime.now().timestamp())}122",
+                "timestamp": f"{int(time.time())}122",
             }
         )
-        stream_info_url += "&signature=" + self.generate_signature(stream_info_url)
+        stream_info_url = self.config["endpoints"]["manifest"].format(kind="avod") + query
+        stream_info_url += "&signature=" + self.generate_signature(self.manifest_paths["avod"], query)
         return self.session.post(
             url=stream_info_url,
             data={
                 "hdr_type": self.hdr_type,
                 "audio_quality": "5.1",  # Will get better audio in different request to make sure it wont error
-                "app_version": self.config["clients"][self.device]["app_version"],
+                "app_version": client["app_version"],
                 "content_id": self.title,
                 "video_quality": self.resolution,
                 "audio_language": self.audio_languages[
                     0
                 ],  # Make sure we always request a language that's available
                 "video_type": "stream",
-                "device_serial": self.config["clients"][self.device]["device_serial"],
+                "device_serial": client["device_serial"],
                 "content_type": "movies" if self.movie else "episodes",
                 "classification_id": self.classification_id,
                 "subtitle_language": "MIS",
-                "player": self.config["clients"][self.device]["player"],
+                "player": client["player"],
             },
         ).json()
 
     def get_me(self):
-        stream_info_url = self.config["endpoints"]["manifest"].format(
-            kind="me"
-        ) + urllib.parse.urlencode(
+        client = self.config["clients"][self.device]
+        query = urllib.parse.urlencode(
             {
                 "audio_language": self.audio_languages[
                     0
@@ -417,15 +393,13 @@ class RakutenTV(BaseService):
                 "classification_id": self.classification_id,
                 "content_id": self.title,
                 "content_type": "movies" if self.movie else "episodes",
-                "device_identifier": self.config["clients"][self.device][
-                    "device_identifier"
-                ],
+                "device_identifier": client["device_identifier"],
                 "device_serial": "not_implemented",
                 "device_stream_audio_quality": "5.1",
                 "device_stream_hdr_type": self.hdr_type,
                 "device_stream_video_quality": self.resolution,
                 "device_uid": "affa434b-8b7c-4ff3-a15e-df1fe500e71e",
-                "device_year": self.config["clients"][self.device]["device_year"],
+                "device_year": client["device_year"],
                 "disable_dash_legacy_packages": "false",
                 "gdpr_consent": self.config["gdpr_consent"],
                 "gdpr_consent_opt_out": 0,
@@ -433,7 +407,7 @@ class RakutenTV(BaseService):
                 "ifa_subscriber_id": self.ifa_subscriber_id,
                 "locale": self.locale,
                 "market_code": self.market_code,
-                "player": self.config["clients"][self.device]["player"],
+                "player": client["player"],
                 "player_height": 1080,
                 "player_width": 1920,
                 "publisher_provided_id": "046f58b1-d89b-4fa4-979b-a9bcd6d78a76",
@@ -441,11 +415,12 @@ class RakutenTV(BaseService):
                 "strict_video_quality": "false",
                 "subtitle_formats": ["vtt"],
                 "subtitle_language": "MIS",
-                "timestamp": f"{int(datetime.datetime.now().timestamp())}122",
+                "timestamp": f"{int(time.time())}122",
                 "video_type": "stream",
             }
         )
-        stream_info_url += "&signature=" + self.generate_signature(stream_info_url)
+        stream_info_url = self.config["endpoints"]["manifest"].format(kind="me") + query
+        stream_info_url += "&signature=" + self.generate_signature(self.manifest_paths["me"], query)
         return self.session.post(
             url=stream_info_url,
         ).json()
@@ -453,77 +428,83 @@ class RakutenTV(BaseService):
     def append_tracks(self, tracks):
         codec = tracks.videos[0].codec[:4]
         if "avc1" in codec:
-            for n in range(100):
-                ismv = re.sub(
-                    rf"{codec}-[0-9]",
-                    rf"{codec}-{len(tracks.videos) + 1}",
-                    tracks.videos[-1].url,
-                )
-                if self.session.head(ismv).status_code != 200:
-                    break
+            # the stream indices are contiguous, so probe all candidates at
+            # once and keep the prefix that exists
+            start = len(tracks.videos) + 1
+            pattern = re.compile(rf"{codec}-[0-9]")
+            candidates = [
+                pattern.sub(rf"{codec}-{start + n}", tracks.videos[-1].url)
+                for n in range(100)
+            ]
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                statuses = list(pool.map(lambda url: self.session.head(url).status_code, candidates))
+                found = []
+                for url, status in zip(candidates, statuses):
+                    if status != 200:
+                        break
+                    found.append(url)
+                infos = list(pool.map(self.probe_media_info, found))
+            for ismv, info in zip(found, infos):
                 video = copy(tracks.videos[-1])
                 video.url = ismv
-                video.id = hashlib.md5(ismv.encode()).hexdigest()
-                with open(f"{directories.temp}/video_bytes.mp4", "wb+") as chunkfile:
-                    data = self.session.get(
-                        url=ismv, headers={"Range": "bytes=0-50000"}
-                    )
-                    chunkfile.write(data.content)
-                info = MediaInfo.parse(f"{directories.temp}/video_bytes.mp4")
+                video.id = hashlib.blake2s(ismv.encode(), digest_size=16).hexdigest()
                 video.height = info.video_tracks[0].height
                 video.width = info.video_tracks[0].width
                 video.bitrate = info.video_tracks[0].maximum_bit_rate
                 if not video.bitrate:
                     video.bitrate = info.video_tracks[0].bit_rate
-                os.remove(f"{directories.temp}/video_bytes.mp4")
                 tracks.videos.append(video)
 
         if self.audio_languages:
-            for language in self.audio_languages:
-                for codec in ["dts", "ec-3", "ac-3", "mp4a"]:
-                    isma = re.sub(
-                        rf"audio-{self.audio_languages[0].lower()}-mp4a-1",
-                        rf"audio-{language.lower()}-{codec}-1",
-                        tracks.audios[0].url,
-                    )
-                    if (
-                        self.session.head(isma).status_code != 200
-                        or language == self.audio_languages[0]
-                        and codec == "mp4a"
-                    ):
-                        continue
-                    audio = copy(tracks.audios[0])
-                    audio.codec = codec
-                    audio.url = isma
-                    audio.id = hashlib.md5(isma.encode()).hexdigest()
-                    audio.language = Language.get(language.lower())
-                    audio.is_original_lang = (
-                        True
-                        if audio.language.language == tracks.videos[0].language.language
-                        and tracks.videos[0].is_original_lang
-                        else False
-                    )
-                    with open(f"{directories.temp}/audio_bytes.mp4", "wb+") as bytetest:
-                        data = self.session.get(
-                            url=isma, headers={"Range": "bytes=0-50000"}
-                        )
-                        bytetest.write(data.content)
-                    info = MediaInfo.parse(f"{directories.temp}/audio_bytes.mp4")
-                    audio.bitrate = info.audio_tracks[0].bit_rate
-                    if codec != "mp4a":  # TODO: Don't assume
-                        audio.channels = "6"
-                    os.remove(f"{directories.temp}/audio_bytes.mp4")
-                    tracks.audios.append(audio)
+            combos = [
+                (language, codec)
+                for language in self.audio_languages
+                for codec in ["dts", "ec-3", "ac-3", "mp4a"]
+                if not (language == self.audio_languages[0] and codec == "mp4a")
+            ]
+            pattern = re.compile(rf"audio-{self.audio_languages[0].lower()}-mp4a-1")
+            candidates = [
+                (language, codec, pattern.sub(rf"audio-{language.lower()}-{codec}-1", tracks.audios[0].url))
+                for language, codec in combos
+            ]
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                statuses = list(pool.map(lambda x: self.session.head(x[2]).status_code, candidates))
+                hits = [x for x, status in zip(candidates, statuses) if status == 200]
+                infos = list(pool.map(lambda x: self.probe_media_info(x[2]), hits))
+            for (language, codec, isma), info in zip(hits, infos):
+                audio = copy(tracks.audios[0])
+                audio.codec = codec
+                audio.url = isma
+                audio.id = hashlib.blake2s(isma.encode(), digest_size=16).hexdigest()
+                audio.language = Language.get(language.lower())
+                audio.is_original_lang = (
+                    True
+                    if audio.language.language == tracks.videos[0].language.language
+                    and tracks.videos[0].is_original_lang
+                    else False
+                )
+                audio.bitrate = info.audio_tracks[0].bit_rate
+                if codec != "mp4a":  # TODO: Don't assume
+                    audio.channels = "6"
+                tracks.audios.append(audio)
+
+    def probe_media_info(self, url):
+        """
+        Parse stream metadata from the smallest head range that covers the
+        moov atom; most streams fit in the first 8 KB, so only re-fetch the
+        larger range when the short one doesn't parse.
+        """
+        for byte_range in ("bytes=0-8191", "bytes=0-65535"):
+            data = self.session.get(url=url, headers={"Range": byte_range}).content
+            info = MediaInfo.parse(io.BytesIO(data))
+            if info.video_tracks or info.audio_tracks:
+                break
+        return info
 
     def get_session(self):
+        # no raise_for_status hook here on purpose: append_tracks probes
+        # stream URLs by status code. configure() mounts the retry adapter.
         session = requests.Session()
-        session.mount("https://", HTTPAdapter(
-            max_retries=Retry(
-                total=5,
-                backoff_factor=1,
-                status_forcelist=[429, 500, 502, 503, 504],
-            )
-        ))
         session.headers.update(config.headers)
         session.cookies.update(self.cookies or {})
         return session
\ No newline at end of file
@@ -1,6 +1,8 @@
 import json
 import re
 import sys
+import threading
+import time
 from collections.abc import Generator
 from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
@@ -10,10 +12,19 @@ from urllib.parse import unquote, urlparse
 import uuid
 import click
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from vinetrimmer.objects import Title, Tracks, MenuTrack, TextTrack
 from vinetrimmer.services.BaseService import BaseService
 from vinetrimmer.utils.widevine.device import LocalDevice
 
+try:
+    import orjson
+
+    _json_dumps = orjson.dumps
+except ImportError:
+    def _json_dumps(obj):
+        return json.dumps(obj).encode()
+
 class ROKU(BaseService):
     """
     Service code for The Roku Channel (https://therokuchannel.roku.com)
@@ -38,7 +49,8 @@ class ROKU(BaseService):
 
     #GEOFENCE = ("us",)
     ALIASES = ["ROKU", "Roku"]
-    TITLE_RE = r"^(?:https?://(?:www.)?therokuchannel.roku.com/(?:details|watch)/)?(?P<id>[a-z0-9-]+)"
+    TITLE_RE = re.compile(r"^(?:https?://(?:www.)?therokuchannel.roku.com/(?:details|watch)/)?(?P<id>[a-z0-9-]+)")
+    CSRF_TTL = 600  # seconds to reuse a csrf token across episodes
 
     @staticmethod
     @click.command(name="ROKU", short_help="https://therokuchannel.roku.com", help=__doc__)
@@ -48,11 +60,14 @@ class ROKU(BaseService):
         return ROKU(ctx, **kwargs)
 
     def __init__(self, ctx, title):
-        self.title = re.match(self.TITLE_RE, title).group("id")
+        self.title = self.TITLE_RE.match(title).group("id")
         super().__init__(ctx)
 
         self.licenseurl = None
         self.cdm = ctx.obj.cdm
+        self._csrf = None
+        self._csrf_ts = 0.0
+        self._csrf_lock = threading.Lock()
         self.configure()
 
 
@@ -111,7 +126,7 @@ class ROKU(BaseService):
 
 
     def get_tracks(self, title):
-        token = self.session.get(self.config["endpoints"]["token"]).json()["csrf"]
+        token = self.get_csrf_token()
 
         options = title.service_data["viewOptions"]
         subscription = options[0].get("license", "").lower()
@@ -126,20 +141,20 @@ class ROKU(BaseService):
 
         headers = {
             "csrf-token": token,
+            "Content-Type": "application/json",
         }
         payload = {
+            **self.vod_payload_base,
             "rokuId": title.id,
             "playId": play_id,
-            "mediaFormat": "mpeg-dash",
-            "drmType": "playready" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "widevine",
-            "quality": "fhd",
             "providerId": provider_id,
         }
 
         r = self.session.post(
             self.config["endpoints"]["vod"],
             headers=headers,
-            json=payload,
+            data=_json_dumps(payload),
+            timeout=(5, 30),
         )
         r.raise_for_status()
 
@@ -183,25 +198,30 @@ class ROKU(BaseService):
         return self.license(**_)
 
     def license(self, challenge, **_) -> bytes:
-        if self.cdm.device.type == LocalDevice.Types.PLAYREADY:
-            r = self.session.post(url=self.licenseurl, data=challenge)
-            if r.status_code != 200:
-                self.log.error(r.content)
-                sys.exit(1)
-            return r.content
-        else:
-            r = self.session.post(url=self.licenseurl, data=challenge)
-            if r.status_code != 200:
-                self.log.error(r.content)
-                sys.exit(1)
-            return r.content
+        # same endpoint and handling for PlayReady and Widevine
+        r = self.session.post(url=self.licenseurl, data=challenge)
+        if r.status_code != 200:
+            self.log.error(r.content)
+            sys.exit(1)
+        return r.content
         
 
     # service specific functions
 
+    def get_csrf_token(self) -> str:
+        """Fetch the csrf token once and reuse it across a bulk pull."""
+        with self._csrf_lock:
+            if not self._csrf or time.monotonic() - self._csrf_ts > self.CSRF_TTL:
+                self._csrf = self.session.get(self.config["endpoints"]["token"]).json()["csrf"]
+                self._csrf_ts = time.monotonic()
+            return self._csrf
+
     def fetch_episode(self, episode: dict) -> json:
         try:
-            r = self.session.get(self.config["endpoints"]["content"] + episode["meta"]["id"])
+            r = self.session.get(
+                self.config["endpoints"]["content"] + episode["meta"]["id"],
+                timeout=(5, 30),  # a single hung host shouldn't stall the pool
+            )
             r.raise_for_status()
             return r.json()
         except requests.exceptions.RequestException as e:
@@ -210,13 +230,32 @@ class ROKU(BaseService):
 
     def fetch_episodes(self, data: dict) -> list:
         """TODO: Switch to async once https proxies are fully supported"""
-        with ThreadPoolExecutor(max_workers=10) as executor:
+        if not data["episodes"]:
+            return []
+        with ThreadPoolExecutor(max_workers=min(32, len(data["episodes"]))) as executor:
             tasks = list(executor.map(self.fetch_episode, data["episodes"]))
         return [task for task in tasks if task is not None]
-        
+
     def configure(self):
         #if cookies is not None:
         #    self.session.cookies.update(cookies)
+        # size the pool to the episode-prefetch concurrency so all workers
+        # reuse keep-alive connections instead of re-handshaking TLS
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+            )
+        ))
+        # the static half of the per-episode VOD payload
+        self.vod_payload_base = {
+            "mediaFormat": "mpeg-dash",
+            "drmType": "playready" if self.cdm.device.type == LocalDevice.Types.PLAYREADY else "widevine",
+            "quality": "fhd",
+        }
         self.session.get('https://therokuchannel.roku.com/')
-        self.cookies = json.loads(json.dumps(self.session.cookies.get_dict()))
+        self.cookies = dict(self.session.cookies.get_dict())
         self.cookies['_usn'] = str(uuid.uuid4())
\ No newline at end of file
@@ -1,14 +1,16 @@
-import base64
 import json
+import re
 import sys
 import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from hashlib import md5
-from uuid import UUID
 
 import click
 import requests
-from bs4 import BeautifulSoup
+from lxml import html
+from requests.adapters import HTTPAdapter, Retry
 from Cryptodome.Hash import HMAC, SHA256
 
 from vinetrimmer.objects import AudioTrack, TextTrack, Title, Tracks, VideoTrack
@@ -18,6 +20,37 @@ from vinetrimmer.utils.collections import as_list
 from vinetrimmer.vendor.pymp4.parser import Box
 from vinetrimmer.utils.widevine.device import LocalDevice
 
+try:
+    import orjson
+
+    def _json_loads(data):
+        return orjson.loads(data)
+except ImportError:
+    def _json_loads(data):
+        return json.loads(data)
+
+# batch runs re-instantiate the service per title; config and tokens stay
+# valid far longer than that, so share them across instances
+_CONFIG_CACHE: dict = {}
+_TOKEN_CACHE: dict = {}
+TOKEN_TTL = 1800  # seconds
+
+
+@lru_cache(maxsize=8)
+def _key_id_pssh(key_id):
+    """
+    Downstream consumers want the parsed Box, so the build/parse
+    round-trip stays, but it only runs once per key id.
+    """
+    return Box.parse(Box.build(dict(
+        type=b"pssh",
+        version=0,
+        flags=0,
+        system_ID=Cdm.uuid,
+        # \x12\x10 is decimal ascii representation of \f\n (\r\n)
+        init_data=b"\x12\x10" + bytes.fromhex(key_id.replace("-", ""))
+    )))
+
 class Stan(BaseService):
     """
     Service code for Nine Digital's Stan. streaming service (https://stan.com.au).
@@ -30,8 +63,8 @@ class Stan(BaseService):
     ALIASES = ["STAN"]
     #GEOFENCE = ["au"]
     TITLE_RE = [
-        r"^(?:https?://play\.stan\.com\.au/programs/)?(?P<id>\d+)",
-        r"^(?:https?://(?:www\.)?stan\.com\.au/watch/)?(?P<id>[a-z0-9-]+)",
+        re.compile(r"^(?:https?://play\.stan\.com\.au/programs/)?(?P<id>\d+)"),
+        re.compile(r"^(?:https?://(?:www\.)?stan\.com\.au/watch/)?(?P<id>[a-z0-9-]+)"),
     ]
 
     AUDIO_CODEC_MAP = {
@@ -65,33 +98,37 @@ class Stan(BaseService):
         self.login_data: dict[str, str] = {}
         self.license_api = None
         self.license_cd = None
+        self._program_cache: dict[str, dict] = {}
 
         self.configure()
 
     def get_titles(self):
         if not self.title.isnumeric():
             r = self.session.get(self.config["endpoints"]["watch"].format(title_id=self.title))
-            soup = BeautifulSoup(r.text, "lxml-html")
-            data = json.loads(soup.select_one("script[type='application/ld+json']").text)
+            # only one ld+json tag is needed, so parse with lxml directly
+            # instead of building a BeautifulSoup object graph for the page
+            ld_json = html.fromstring(r.content).find(".//script[@type='application/ld+json']")
+            data = json.loads(ld_json.text)
             self.title = data["@id"]
 
         r = self.session.get(f"{self.api_config['cat']['v12']}/programs/{self.title}.json")
         try:
-            res = r.json()
+            res = _json_loads(r.content)
         except json.JSONDecodeError:
             raise self.log.exit(f" - Failed to load title manifest: {r.text}")
+        # get_tracks fetches the same program manifest for movies; keep it
+        self._program_cache[str(self.title)] = res
+        original_language = res.get("original_language")
         if "audioTracks" in res:
-            res["original_language"] = [x["language"]["iso"] for x in res["audioTracks"] if x["type"] == "main"]
-            if len(res["original_language"]) > 0:
-                res["original_language"] = res["original_language"][0]
-
-        original_language = res["original_language"]
+            # only the first main track matters, so stop at the first match
+            # instead of materializing every iso code
+            original_language = next(
+                (x["language"]["iso"] for x in res["audioTracks"] if x["type"] == "main"),
+                None,
+            )
+            res["original_language"] = original_language
         if not original_language:
-            original_language = [x for x in res["audioTracks"] if x["type"] == "main"]
-            if original_language:
-                original_language = original_language[0]["language"]["iso"]
-            else:
-                original_language = res["languages"][0]
+            original_language = res["languages"][0]
 
         if not res.get("seasons"):
             return Title(
@@ -105,10 +142,13 @@ class Stan(BaseService):
             )
         else:
             titles = []
-            for season in res["seasons"]:
-                r = self.session.get(season["url"])
+            # the season manifests are independent, so fetch them all at
+            # once; pool.map keeps them in season order
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                responses = list(pool.map(lambda x: self.session.get(x["url"]), res["seasons"]))
+            for r in responses:
                 try:
-                    season_res = r.json()
+                    season_res = _json_loads(r.content)
                 except json.JSONDecodeError:
                     raise self.log.exit(f" - Failed to load season manifest: {r.text}")
                 for episode in season_res["entries"]:
@@ -129,9 +169,13 @@ class Stan(BaseService):
             ) for x in titles]
 
     def get_tracks(self, title: Title) -> Tracks:
-        program_data = self.session.get(
-            f"{self.api_config['cat']['v12']}/programs/{title.service_data['id']}.json"
-        ).json()
+        program_id = str(title.service_data["id"])
+        program_data = self._program_cache.get(program_id)
+        if program_data is None:
+            program_data = _json_loads(self.session.get(
+                f"{self.api_config['cat']['v12']}/programs/{program_id}.json"
+            ).content)
+            self._program_cache[program_id] = program_data
 
         res = self.session.get(
             url=program_data["streams"][self.vquality]["dash"]["auto"]["url"],
@@ -143,7 +187,7 @@ class Stan(BaseService):
             }
         )
         try:
-            stream_data = res.json()
+            stream_data = _json_loads(res.content)
         except json.JSONDecodeError:
             raise ValueError(f"Failed to load stream data: {res.text}")
         if "media" not in stream_data:
@@ -172,14 +216,12 @@ class Stan(BaseService):
             source=self.ALIASES[0]
         )
         if self.acodec:
-            tracks.audios = [
-                x for x in tracks.audios
-                if x.codec[:4] == self.AUDIO_CODEC_MAP[self.acodec]
-            ]
+            target = self.AUDIO_CODEC_MAP[self.acodec]
+            tracks.audios = [x for x in tracks.audios if x.codec.startswith(target)]
         if "captions" in stream_data:
             for sub in stream_data["captions"]:
                 tracks.add(TextTrack(
-                    id_=md5(sub["url"].encode()).hexdigest()[0:6],
+                    id_=md5(sub["url"].encode()).digest()[:3].hex(),
                     source=self.ALIASES[0],
                     url=sub["url"],
                     # metadata
@@ -191,37 +233,29 @@ class Stan(BaseService):
         # craft pssh with the key_id
         # TODO: is doing this still necessary? since the code now tries grabbing PSSH from
         #       the first chunk of data of the track, it might be available from that.
+        is_hdr10 = self.range == "HDR10"
+
+        for track in tracks:
+            track.needs_proxy = True
+        for track in tracks.videos:
+            track.hdr10 = is_hdr10
+            track.encrypted = True
+        for track in tracks.audios:
+            track.encrypted = True
+
         if self.cdm.device.type == LocalDevice.Types.PLAYREADY:
-            for track in tracks:
-                track.needs_proxy = True
-                if isinstance(track, VideoTrack):
-                    track.hdr10 = self.range == "HDR10"
-                if isinstance(track, (VideoTrack, AudioTrack)):
-                    track.encrypted = True
             video_pssh = next((x.pr_pssh for x in tracks.videos if x.pr_pssh), None)
-
             for track in tracks.audios:
                 if not track.pr_pssh:
                     track.pr_pssh = video_pssh
-                    
-        if not self.cdm.device.type == LocalDevice.Types.PLAYREADY:
-            pssh = Box.parse(Box.build(dict(
-                type=b"pssh",
-                version=0,
-                flags=0,
-                system_ID=Cdm.uuid,
-                # \x12\x10 is decimal ascii representation of \f\n (\r\n)
-                init_data=b"\x12\x10" + UUID(stream_data["drm"]["keyId"]).bytes
-            )))
-
-            for track in tracks:
-                track.needs_proxy = True
-                if isinstance(track, VideoTrack):
-                    track.hdr10 = self.range == "HDR10"
-                if isinstance(track, (VideoTrack, AudioTrack)):
-                    track.encrypted = True
-                    if not track.pssh:
-                        track.pssh = pssh
+        else:
+            pssh = _key_id_pssh(stream_data["drm"]["keyId"])
+            for track in tracks.videos:
+                if not track.pssh:
+                    track.pssh = pssh
+            for track in tracks.audios:
+                if not track.pssh:
+                    track.pssh = pssh
 
         return tracks
 
@@ -234,27 +268,26 @@ class Stan(BaseService):
 
     def license(self, challenge: bytes, **_):
         assert self.license_api is not None
+        headers = {} if self.device_type == "tv" else {"dt-custom-data": self.license_cd}
         try:
             lic = self.session.post(
                 url=self.license_api,
-                headers={} if self.device_type == "tv" else {
-                    "dt-custom-data": self.license_cd
-                },
+                headers=headers,
                 data=challenge  # expects bytes
             )
-            # print(f"lic 1: {lic}")
-        except:
+        except requests.HTTPError:
+            # only worth retrying if the custom-data header wasn't sent yet
+            if "dt-custom-data" in headers or not self.license_cd:
+                raise
             lic = self.session.post(
                 url=self.license_api,
-                headers={
-                    "dt-custom-data": self.license_cd
-                },
+                headers={"dt-custom-data": self.license_cd},
                 data=challenge  # expects bytes
             )
-            # print(f"lic 2: {lic.json()}")
         try:
-            if "license" in lic.json():
-                return lic.json()["license"]  # base64 str?
+            lic_b64 = _json_loads(lic.content).get("license")
+            if lic_b64 is not None:
+                return lic_b64  # base64 str?
         except json.JSONDecodeError:
             return lic.content  # bytes
 
@@ -263,6 +296,17 @@ class Stan(BaseService):
     # Service specific functions
 
     def configure(self) -> None:
+        # one pooled adapter for the login, catalogue and manifest hosts so
+        # the sequential API calls reuse connections instead of re-handshaking
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.2,
+                status_forcelist=[502, 503, 504],
+            )
+        ))
         self.log.info("Retrieving API configuration...")
         self.api_config = self.get_config()
         
@@ -273,14 +317,23 @@ class Stan(BaseService):
             self.login_data = self.get_tv_token(self.login_data)
 
     def get_config(self) -> dict:
+        cached = _CONFIG_CACHE.get(self.device_type)
+        if cached is not None:
+            return cached
         res = self.session.get(
             self.config["endpoints"]["config"].format(type='web/app' if self.device_type == 'web' else 'tv/android'))
         try:
-            return res.json()
+            data = _json_loads(res.content)
         except json.JSONDecodeError:
             raise ValueError(f"Failed to obtain Stan API configuration: {res.text}")
+        _CONFIG_CACHE[self.device_type] = data
+        return data
 
     def check_cookie(self) -> dict:
+        cache_key = ("login", md5(self.session.cookies['streamco_token'].encode()).digest())
+        cached = _TOKEN_CACHE.get(cache_key)
+        if cached and time.time() - cached[0] < TOKEN_TTL:
+            return cached[1]
         res = self.session.post(
             url=self.api_config["login"]["v1"] + self.config["endpoints"]["login"].format(type="web/app"),
             data={
@@ -290,16 +343,21 @@ class Stan(BaseService):
             }
         )
         try:
-            data = res.json()
+            data = _json_loads(res.content)
         except json.JSONDecodeError:
             self.log.exit(f"Failed to log in: {res.text}")
             raise
         if "errors" in data:
             self.log.exit(f"An error occurred while logging in: {data['errors']}")
             raise
+        _TOKEN_CACHE[cache_key] = (time.time(), data)
         return data
 
     def get_tv_token(self, login_data) -> dict:
+        cache_key = ("tv", md5(login_data['jwToken'].encode()).digest())
+        cached = _TOKEN_CACHE.get(cache_key)
+        if cached and time.time() - cached[0] < TOKEN_TTL:
+            return cached[1]
         res = self.session.post(
             url=self.api_config["login"]["v1"] + self.config["endpoints"]["login"].format(type="web/app"),
             data={
@@ -325,9 +383,10 @@ class Stan(BaseService):
             }
         )
         try:
-            data = res.json()
+            data = _json_loads(res.content)
         except json.JSONDecodeError:
             raise ValueError(f"Failed to create token: {res.text}")
         if "errors" in data:
             raise ValueError(f"An error occurred while creating token: {data['errors']}")
+        _TOKEN_CACHE[cache_key] = (time.time(), data)
         return data
\ No newline at end of file
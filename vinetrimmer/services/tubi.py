@@ -1,15 +1,16 @@
 from __future__ import annotations
 
 import hashlib
+import json
 import os
 import re
 import sys
-import uuid
 from collections.abc import Generator
 from typing import Any
 
 import click
 from langcodes import Language
+from lxml import etree
 
 from vinetrimmer.objects import TextTrack, Title, Tracks
 from vinetrimmer.services.BaseService import BaseService
@@ -18,6 +19,19 @@ from vinetrimmer.utils import Cdm
 from vinetrimmer.vendor.pymp4.parser import Box
 from vinetrimmer.utils.widevine.device import LocalDevice
 
+try:
+    import orjson
+
+    def _json_loads(data):
+        return orjson.loads(data)
+except ImportError:
+    def _json_loads(data):
+        return json.loads(data)
+
+# compiled once; namespaces are already stripped by the MPD loader
+_BASEURL_XP = etree.XPath("./BaseURL")
+_ROLE_XP = etree.XPath("./Role")
+
 class TUBI(BaseService):
     """
     Service code for TubiTV streaming service (https://tubitv.com/)
@@ -44,7 +58,7 @@ class TUBI(BaseService):
         - Search is currently disabled.
     """
     ALIASES = ["TUBI", "tubi", "tubitv", "TubiTV"]
-    TITLE_RE = r"^(?:https?://(?:www\.)?tubitv\.com?)?/(?P<type>movies|series|tv-shows)/(?P<id>[a-z0-9-]+)"
+    TITLE_RE = re.compile(r"^(?:https?://(?:www\.)?tubitv\.com?)?/(?P<type>movies|series|tv-shows)/(?P<id>[a-z0-9-]+)")
 
     @staticmethod
     @click.command(name="TUBI", short_help="https://tubitv.com/", help=__doc__)
@@ -61,14 +75,14 @@ class TUBI(BaseService):
 
     def get_titles(self):
         try:
-            kind, content_id = (re.match(self.TITLE_RE, self.title).group(i) for i in ("type", "id"))
+            kind, content_id = self.TITLE_RE.match(self.title).group("type", "id")
         except Exception:
             raise ValueError("Could not parse ID from title - is the URL correct?")
 
         params = {
             "platform": "android",
             "content_id": content_id,
-            "device_id": str(uuid.uuid4()),
+            "device_id": os.urandom(16).hex(),
             "video_resources[]": [
                 "dash",
                 "dash_playready",
@@ -81,53 +95,23 @@ class TUBI(BaseService):
         if kind == "tv-shows":
             content = self.session.get(self.config["endpoints"]["content"], params=params)
             content.raise_for_status()
-            series_id = "0" + content.json().get("series_id")
+            series_id = "0" + _json_loads(content.content).get("series_id")
             params.update({"content_id": int(series_id)})
-            data = self.session.get(self.config["endpoints"]["content"], params=params).json()
-            
-            return [
-                        Title(
-                            id_=episode["id"],
-                            type_=Title.Types.TV,
-                            name=data["title"],
-                            year=data["year"],
-                            season=int(season["id"]),
-                            episode=int(episode["episode_number"]),
-                            episode_name=episode["title"].split("-")[1],
-                            original_lang="en",
-                            source=self.ALIASES[0],
-                            service_data=episode
-                        ) 
-                        for season in data["children"]
-                        for episode in season["children"]
-                    ]
+            data = _json_loads(self.session.get(self.config["endpoints"]["content"], params=params).content)
+
+            return self._episode_titles(data)
 
         if kind == "series":
             r = self.session.get(self.config["endpoints"]["content"], params=params)
             r.raise_for_status()
-            data = r.json()
-
-            return [
-                        Title(
-                            id_=episode["id"],
-                            type_=Title.Types.TV,
-                            name=data["title"],
-                            year=data["year"],
-                            season=int(season["id"]),
-                            episode=int(episode["episode_number"]),
-                            episode_name=episode["title"].split("-")[1],
-                            original_lang="en",
-                            source=self.ALIASES[0],
-                            service_data=episode
-                        ) 
-                        for season in data["children"]
-                        for episode in season["children"]
-                    ]
+            data = _json_loads(r.content)
+
+            return self._episode_titles(data)
 
         if kind == "movies":
             r = self.session.get(self.config["endpoints"]["content"], params=params)
             r.raise_for_status()
-            data = r.json()
+            data = _json_loads(r.content)
             
             return Title(
                     id_=data["id"],
@@ -139,6 +123,28 @@ class TUBI(BaseService):
                     service_data=data,
                 )
 
+    def _episode_titles(self, data):
+        """Flatten the season/episode tree into Title objects."""
+        title_name = data["title"]
+        year = data["year"]
+        source = self.ALIASES[0]
+        return [
+            Title(
+                id_=episode["id"],
+                type_=Title.Types.TV,
+                name=title_name,
+                year=year,
+                season=int(season["id"]),
+                episode=int(episode["episode_number"]),
+                episode_name=episode["title"].partition("-")[2],
+                original_lang="en",
+                source=source,
+                service_data=episode,
+            )
+            for season in data["children"]
+            for episode in season["children"]
+        ]
+
     def get_tracks(self, title):
         if not title.service_data.get("video_resources"):
             self.log.error(" - Failed to obtain video resources. Check geography settings.")
@@ -154,26 +160,34 @@ class TUBI(BaseService):
             source=self.ALIASES[0]
         )
         
+        # most MPDs carry no AdaptationSet-level BaseURL at all, so check the
+        # whole tree once and skip the per-track lookups when there are none
+        first = next(iter(tracks), None)
+        has_base_urls = first is not None and bool(
+            first.extra[1].getroottree().getroot().xpath(".//AdaptationSet/BaseURL")
+        )
+
+        # one pass over the tracks covers both the BaseURL rewrite and the
+        # descriptive-role flag
         for track in tracks:
-            rep_base = track.extra[1].find("BaseURL")
+            adaptation_set = track.extra[1]
+            rep_base = next(iter(_BASEURL_XP(adaptation_set)), None) if has_base_urls else None
             if rep_base is not None:
-                base_url = os.path.dirname(track.url)
-                track_base = rep_base.text
-                track.url = f"{base_url}/{track_base}"
+                # representations may sit in different directories, so derive
+                # the parent per track, but rsplit skips the posixpath dispatch
+                track.url = f"{track.url.rsplit('/', 1)[0]}/{rep_base.text}"
                 track.descriptor = Track.Descriptor.URL
         #        track.downloader = aria2c
 
-                
-        for track in tracks.audios:
-            role = track.extra[1].find("Role")
-            if role is not None and role.get("value") in ["description", "alternative", "alternate"]:
-                track.descriptive = True
+            if isinstance(track, AudioTrack):
+                role = next(iter(_ROLE_XP(adaptation_set)), None)
+                if role is not None and role.get("value") in {"description", "alternative", "alternate"}:
+                    track.descriptive = True
 
-            
         if title.service_data.get("subtitles"):
             tracks.add(
                 TextTrack(
-                    id_=hashlib.md5(title.service_data["subtitles"][0]["url"].encode()).hexdigest()[0:6],
+                    id_=hashlib.md5(title.service_data["subtitles"][0]["url"].encode()).digest()[:3].hex(),
                     source=self.ALIASES[0],
                     url=title.service_data["subtitles"][0]["url"],
                     codec=title.service_data["subtitles"][0]["url"][-3:],
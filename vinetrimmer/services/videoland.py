@@ -4,11 +4,18 @@ from typing import Any
 import click
 import uuid
 import re
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter, Retry
 from vinetrimmer.config import directories
 from vinetrimmer.objects import AudioTrack, TextTrack, MenuTrack, Title, Tracks, VideoTrack
 from vinetrimmer.services.BaseService import BaseService
 from vinetrimmer.utils.widevine.device import LocalDevice
 
+_RE_FOLDER = re.compile(r".+?-f_[0-9]+")
+_RE_NONDIGIT = re.compile(r"\D")
+_RE_PSSH = re.compile(rb"<cenc:pssh>([^<]+)</cenc:pssh>")
+_RE_BEDROCK = re.compile(r"https://[^/]+\.videoland\.bedrock\.tech")
+
 class Videoland(BaseService):
     """
     Service code for RTL's Dutch streaming service Videoland (https://v2.videoland.com).
@@ -45,7 +52,7 @@ class Videoland(BaseService):
         self.session = BaseService.get_session(self)
         self.configure()
 
-        if re.match(r".+?-f_[0-9]+", title):
+        if _RE_FOLDER.match(title):
             title = self.get_program_title(title)
 
         self.title_url = title
@@ -87,44 +94,22 @@ class Videoland(BaseService):
                 if block["featureId"] == "videos_by_season_by_program"
             ]
 
-            totalItems = 0
-            for season in seasons:
-                totalItems = totalItems + season["content"]["pagination"]["totalItems"]
-                while (
-                    len(season["content"]["items"])
-                    != season["content"]["pagination"]["totalItems"]
-                ):
-                    season_data = self.session.get(
-                        url=self.config["endpoints"]["seasoning"].format(
-                            platform=self.platform,
-                            token=self.platform_token,
-                            program=self.title_id,
-                            season_id=season["id"],
-                        ),
-                        params={
-                            "nbPages": "10",
-                            "page": season["content"]["pagination"]["nextPage"],
-                        },
-                    ).json()
-
-                    for episode in season_data["content"]["items"]:
-                        if episode not in season["content"]["items"]:
-                            season["content"]["items"].append(episode)
-
-                    season["content"]["pagination"]["nextPage"] = season_data[
-                        "content"
-                    ]["pagination"]["nextPage"]
+            totalItems = sum(s["content"]["pagination"]["totalItems"] for s in seasons)
+            # pages within a season chain on the nextPage token, but the
+            # seasons themselves are independent, so paginate them in parallel
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                list(pool.map(self.fetch_season_items, seasons))
 
             episodes = []
             for season in seasons:
+                positions = {id(e): i for i, e in enumerate(season["content"]["items"])}
                 for episode in season["content"]["items"]:
                     episode["seasonNumber"] = int(
-                        re.sub("\D", "", season["title"]["long"])
+                        _RE_NONDIGIT.sub("", season["title"]["long"])
                     )
                     try:
                         episode["episodeNumber"] = int(
-                            re.sub(
-                                "\D",
+                            _RE_NONDIGIT.sub(
                                 "",
                                 episode["itemContent"]["action"]["target"][
                                     "value_layout"
@@ -132,9 +117,7 @@ class Videoland(BaseService):
                             )
                         )
                     except ValueError:
-                        episode["episodeNumber"] = (
-                            int(season["content"]["items"].index(episode)) + 1
-                        )
+                        episode["episodeNumber"] = positions[id(episode)] + 1
 
                     episodes.append(episode)
 
@@ -158,23 +141,54 @@ class Videoland(BaseService):
                     "value_layout"
                 ]["id"]
 
-                titles = [
-                    Title(
-                        id_=episode["ucid"],
-                        type_=Title.Types.TV,
-                        name=metadata["entity"]["metadata"]["title"],
-                        year=0,  # TODO: see if we can find the releaseYear
-                        season=episode["seasonNumber"],
-                        episode=episode["episodeNumber"],
-                        episode_name=episode["itemContent"]["extraTitle"],
-                        original_lang="nl",  # Will get it from the manifest
-                        source=self.ALIASES[0],
-                        service_data=episode,
-                    )
-                    for episode in episodes
-                ]
+            titles = [
+                Title(
+                    id_=episode["ucid"],
+                    type_=Title.Types.TV,
+                    name=metadata["entity"]["metadata"]["title"],
+                    year=0,  # TODO: see if we can find the releaseYear
+                    season=episode["seasonNumber"],
+                    episode=episode["episodeNumber"],
+                    episode_name=episode["itemContent"]["extraTitle"],
+                    original_lang="nl",  # Will get it from the manifest
+                    source=self.ALIASES[0],
+                    service_data=episode,
+                )
+                for episode in episodes
+            ]
         return titles
 
+    def fetch_season_items(self, season):
+        """Follow a season's pagination until every episode is collected."""
+        # dedup pages on episode id; comparing whole episode dicts
+        # made the merge quadratic
+        seen = {e["ucid"] for e in season["content"]["items"]}
+        while (
+            len(season["content"]["items"])
+            != season["content"]["pagination"]["totalItems"]
+        ):
+            season_data = self.session.get(
+                url=self.config["endpoints"]["seasoning"].format(
+                    platform=self.platform,
+                    token=self.platform_token,
+                    program=self.title_id,
+                    season_id=season["id"],
+                ),
+                params={
+                    "nbPages": "10",
+                    "page": season["content"]["pagination"]["nextPage"],
+                },
+            ).json()
+
+            for episode in season_data["content"]["items"]:
+                if episode["ucid"] not in seen:
+                    seen.add(episode["ucid"])
+                    season["content"]["items"].append(episode)
+
+            season["content"]["pagination"]["nextPage"] = season_data[
+                "content"
+            ]["pagination"]["nextPage"]
+
     def get_tracks(self, title):
         manifest = self.session.get(
             url=self.config["endpoints"]["layout"].format(
@@ -193,29 +207,21 @@ class Videoland(BaseService):
         if not assets:
             self.log.exit(f"\nFailed to load content manifest")
             
-        mpd_url = [
-            asset
-            for asset in assets
-            if asset["quality"]
-            == f"{'hd'}"
-        ]
-
-        if not mpd_url:
-            mpd_url = [asset for asset in assets if asset["quality"] == "sd"][0]["path"]
-        else:
-            mpd_url = mpd_url[0]["path"]
+        asset = (
+            next((a for a in assets if a["quality"] == "hd"), None)
+            or next(a for a in assets if a["quality"] == "sd")
+        )
+        mpd_url = asset["path"]
             
         all_pssh = []
         r = self.session.get(mpd_url)
-        psshes = re.findall(r'<cenc:pssh>.+</cenc:pssh>', r.text)
-        for pssh in psshes:
+        for pssh in _RE_PSSH.findall(r.content):
             if len(pssh) > 200:
-                pssh = pssh.replace("<cenc:pssh>", '').replace("</cenc:pssh>", '') 
+                pssh = pssh.decode()
                 if pssh not in all_pssh:
                     all_pssh.append(pssh)
 
-        for pssh_playready in all_pssh:
-            self.pssh_playready = pssh_playready
+        self.pssh_playready = all_pssh[-1] if all_pssh else None
 
         tracks = Tracks.from_mpd(
             url=mpd_url,
@@ -236,11 +242,12 @@ class Videoland(BaseService):
                 else:
                     self.log.exit("\nVideoland: TextTrack codec unknown.")
 
-            for uri in track.url.copy():
-                track.url[track.url.index(uri)] = re.sub(
-                    r"https://.+?.videoland.bedrock.tech",
+            urls = track.url
+            for i, uri in enumerate(urls):
+                urls[i] = _RE_BEDROCK.sub(
                     "https://origin.vod.videoland.bedrock.tech",
-                    uri.split("?")[0],
+                    uri.partition("?")[0],
+                    count=1,
                 )
 
         return tracks
@@ -296,6 +303,17 @@ class Videoland(BaseService):
                 "x-customer-name": "rtlnl",
             }
         )
+        # auth, layout, pagination, manifest and license all hit a handful of
+        # RTL/bedrock hosts; pool them so TLS handshakes amortize
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=(502, 503, 504),
+            )
+        ))
 
     def get_license_token(self, title):
         return self.session.get(
@@ -1,4 +1,5 @@
 import base64
+from functools import lru_cache
 
 
 def encode(s):
@@ -7,10 +8,12 @@ def encode(s):
     return base64.b64encode(s).decode()
 
 
+@lru_cache(maxsize=128)
 def decode(s):
     if isinstance(s, str):
         s = s.encode()
-    return base64.b64decode(s + b"==")
+    pad = -len(s) % 4
+    return base64.b64decode(s + b"=" * pad if pad else s)
 
 
 def urlsafe_encode(s):
@@ -19,7 +22,9 @@ def urlsafe_encode(s):
     return base64.urlsafe_b64encode(s).decode().rstrip("=")
 
 
+@lru_cache(maxsize=128)
 def urlsafe_decode(s):
     if isinstance(s, str):
         s = s.encode()
-    return base64.urlsafe_b64decode(s + b"==")
+    pad = -len(s) % 4
+    return base64.urlsafe_b64decode(s + b"=" * pad if pad else s)
@@ -1,22 +1,31 @@
-import itertools
+from collections import deque
 from typing import Iterable, Sequence
 
 
+def _fold_key(key):
+    return key.casefold() if isinstance(key, str) else key.lower()
+
+
 class CaseInsensitiveDict(dict):
     """
     A dictionary with case-insensitive keys.
+
+    A sidecar map of folded key -> stored key keeps lookups O(1) instead of
+    re-folding every stored key per access.
     """
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        self._fold = {}
         for k in self.keys():
             if not isinstance(k, (str, bytes)):
                 raise ValueError(f"dictionary keys must be str or bytes, not {type(k)}")
+            self._fold[_fold_key(k)] = k
 
     def _resolve_key(self, key):
         if not isinstance(key, (str, bytes)):
             raise ValueError(f"dictionary keys must be str or bytes, not {type(key)}")
-        return next((x for x in self.keys() if x.casefold() == key.casefold()), key)
+        return self._fold.get(_fold_key(key), key)
 
     def __contains__(self, key):
         return super().__contains__(self._resolve_key(key))
@@ -25,19 +34,25 @@ class CaseInsensitiveDict(dict):
         return super().__getitem__(self._resolve_key(key))
 
     def __setitem__(self, key, value):
-        return super().__setitem__(self._resolve_key(key), value)
+        key = self._resolve_key(key)
+        self._fold[_fold_key(key)] = key
+        return super().__setitem__(key, value)
 
     def get(self, key, default=None):
         return super().get(self._resolve_key(key), default)
 
     def pop(self, key):
-        return super().pop(self._resolve_key(key))
+        key = self._resolve_key(key)
+        self._fold.pop(_fold_key(key), None)
+        return super().pop(key)
 
     def popitem(self, key):
         return super().popitem(self._resolve_key(key))
 
     def setdefault(self, key, value=None):
-        return super().setdefault(self._resolve_key(key), value)
+        key = self._resolve_key(key)
+        self._fold.setdefault(_fold_key(key), key)
+        return super().setdefault(key, value)
 
     def update(self, other):
         for k, v in other.items():
@@ -67,12 +82,6 @@ class ObserverDict(dict):
             self[k] = v
 
 
-def as_lists(*args):
-    """Convert any input objects to list objects."""
-    for item in args:
-        yield item if isinstance(item, list) else [item]
-
-
 def as_list(*args):
     """
     Convert any input objects to a single merged list object.
@@ -83,7 +92,13 @@ def as_list(*args):
     """
     if args == (None,):
         return []
-    return list(itertools.chain.from_iterable(as_lists(*args)))
+    out = []
+    for item in args:
+        if type(item) is list:
+            out.extend(item)
+        else:
+            out.append(item)
+    return out
 
 
 def first(iterable):
@@ -91,7 +106,9 @@ def first(iterable):
 
 
 def first_or_else(iterable, default):
-    item = next(iter(iterable or []), None)
+    if not iterable:
+        return default
+    item = next(iter(iterable), None)
     if item is None:
         return default
     return item
@@ -105,6 +122,8 @@ def flatten(items, ignore_types=str):
     """
     Flatten items recursively.
 
+    Iterative so deeply nested lists don't pay a Python frame per level.
+
     Example:
     >>> list(flatten(["foo", [["bar", ["buzz", [""]], "bee"]]]))
     ['foo', 'bar', 'buzz', '', 'bee']
@@ -113,20 +132,35 @@ def flatten(items, ignore_types=str):
     >>> list(flatten({1}, set))
     [{1}]
     """
-    if isinstance(items, (Iterable, Sequence)) and not isinstance(items, ignore_types):
-        for i in items:
-            yield from flatten(i, ignore_types)
-    else:
-        yield items
+    stack = deque([iter((items,))])
+    while stack:
+        iterator = stack[-1]
+        for item in iterator:
+            if isinstance(item, (Iterable, Sequence)) and not isinstance(item, ignore_types):
+                stack.append(iter(item))
+                break
+            yield item
+        else:
+            stack.pop()
 
 
 def merge_dict(*dicts):
     """Recursively merge dicts into dest in-place."""
     dest = dicts[0]
     for d in dicts[1:]:
-        for key, value in d.items():
-            if isinstance(value, dict):
-                node = dest.setdefault(key, {})
-                merge_dict(node, value)
-            else:
-                dest[key] = value
+        _merge_into(dest, d)
+
+
+def _merge_into(dest, src):
+    # config merges are mostly scalar leaves; a flat layer is one C-level update
+    if not any(isinstance(v, dict) for v in src.values()):
+        dest.update(src)
+        return
+    for key, value in src.items():
+        if isinstance(value, dict):
+            node = dest.get(key)
+            if not isinstance(node, dict):
+                node = dest[key] = {}
+            _merge_into(node, value)
+        else:
+            dest[key] = value
@@ -4,11 +4,25 @@ import shutil
 
 from ruamel.yaml import YAML
 
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+except ImportError:
+    _json_loads = json.loads
+
+    def _json_dumps(obj):
+        return json.dumps(obj).encode()
+
+# loader setup is expensive; build it once and reuse it for every read_yaml
+_YAML = YAML()
+
 
 # We can't subclass pathlib.Path directly (https://bugs.python.org/issue24132)
 class Path(type(pathlib.Path())):
-    def append_bytes(self, data, mode="ab", encoding="utf-8"):
-        with self.open(mode, encoding=encoding) as fd:
+    def append_bytes(self, data, mode="ab"):
+        with self.open(mode) as fd:
             return fd.write(data)
 
     def append_line(self, line, **kwargs):
@@ -28,14 +42,13 @@ class Path(type(pathlib.Path())):
         return Path(shutil.move(self, target))
 
     def open(self, mode="r", encoding=None, **kwargs):
-        if not encoding and "b" not in mode:
-            encoding = "utf-8"
-        return super().open(mode, encoding=encoding, **kwargs)
+        if "b" in mode:
+            return super().open(mode, **kwargs)
+        return super().open(mode, encoding=encoding or "utf-8", **kwargs)
 
     def read_json(self, missing_ok=False):
         try:
-            with self.open() as fd:
-                return json.load(fd)
+            return _json_loads(self.read_bytes())
         except FileNotFoundError:
             if missing_ok:
                 return {}
@@ -46,10 +59,10 @@ class Path(type(pathlib.Path())):
 
     def read_yaml(self, missing_ok=False):
         try:
-            return YAML().load(self.with_suffix(".yaml"))
+            return _YAML.load(self.with_suffix(".yaml"))
         except FileNotFoundError:
             try:
-                return YAML().load(self.with_suffix(".yml"))
+                return _YAML.load(self.with_suffix(".yml"))
             except FileNotFoundError:
                 if missing_ok:
                     return {}
@@ -70,8 +83,7 @@ class Path(type(pathlib.Path())):
                 raise
 
     def write_json(self, obj):
-        with self.open("w") as fd:
-            return json.dump(obj, fd)
+        return self.write_bytes(_json_dumps(obj))
 
     def write_text(self, text, encoding="utf-8"):
         return super().write_text(text, encoding=encoding)
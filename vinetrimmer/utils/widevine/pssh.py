@@ -1,20 +1,23 @@
+import re
+import struct
 import uuid
+from functools import lru_cache
 
 from vinetrimmer.vendor.pymp4.parser import Box
 
 from vinetrimmer.utils import base64, WidevineCencHeader
+from vinetrimmer.utils.collections import first_or_none
 from vinetrimmer.utils.widevine.cdm import Cdm
 from vinetrimmer.utils.xml import load_xml
 
-def first_or_else(iterable, default):
-    return next(iter(iterable or []), None) or default
+# the v4.0/v4.1 WRMHEADER layouts carry the KID in one of these two shapes;
+# a regex scan beats building the whole lxml tree for them
+_RE_KID_V40 = re.compile(r"<KID>([^<]+)</KID>")
+_RE_KID_V41 = re.compile(r'<KID[^>]*\bVALUE="([^"]+)"')
 
 
-def first_or_none(iterable):
-    return first_or_else(iterable, None)
+_WIDEVINE_SYSTEM_ID = uuid.UUID("{9a04f079-9840-4286-ab92-e65be0885f95}").bytes
 
-def first(iterable):
-    return next(iter(iterable))
 
 def build_pssh(*, kid=None, init_data=None):
     if not (bool(kid) ^ bool(init_data)):
@@ -22,17 +25,23 @@ def build_pssh(*, kid=None, init_data=None):
 
     if kid:
         init_data = b"\x12\x10" + kid
-    #print(Cdm.uuid)
 
-    return Box.parse(Box.build({
-        "type": b"pssh",
-        "version": 0,
-        "flags": 0,
-        "system_ID": uuid.UUID("{9a04f079-9840-4286-ab92-e65be0885f95}"),
-        "init_data": init_data,
-    }))
+    # a v0 pssh box has a fixed layout, so assemble the bytes directly and
+    # only pay for one Box.parse instead of the build/parse round-trip:
+    # size | 'pssh' | version+flags | system id | data length | data
+    raw = struct.pack(
+        ">I4sI16sI",
+        32 + len(init_data),
+        b"pssh",
+        0,
+        _WIDEVINE_SYSTEM_ID,
+        len(init_data),
+    ) + init_data
 
+    return Box.parse(raw)
 
+
+@lru_cache(maxsize=256)
 def generate_from_kid(kid: str):
     if not kid:
         return None
@@ -40,6 +49,7 @@ def generate_from_kid(kid: str):
     return build_pssh(kid=uuid.UUID(kid).bytes)
 
 
+@lru_cache(maxsize=256)
 def generate_from_b64(pssh: str):
     if not pssh:
         return None
@@ -47,6 +57,7 @@ def generate_from_b64(pssh: str):
     return Box.parse(base64.decode(pssh))
 
 
+@lru_cache(maxsize=256)
 def convert_playready_pssh(pssh):
     if isinstance(pssh, bytes):
         xml_str = pssh
@@ -58,13 +69,17 @@ def convert_playready_pssh(pssh):
     xml_str = xml_str.decode("utf-16-le", "ignore")
     xml_str = xml_str[xml_str.index("<"):]
 
-    xml = load_xml(xml_str).find("DATA")  # root: WRMHEADER
+    m = _RE_KID_V40.search(xml_str) or _RE_KID_V41.search(xml_str)
+    if m:
+        kid = m.group(1)
+    else:
+        xml = load_xml(xml_str).find("DATA")  # root: WRMHEADER
 
-    kid = (
-        xml.findtext("KID")  # v4.0.0.0
-        or first_or_none(xml.xpath("PROTECTINFO/KID/@VALUE"))  # v4.1.0.0
-        or first_or_none(xml.xpath("PROTECTINFO/KIDS/KID/@VALUE"))  # v4.3.0.0 - can be multiple?
-    )
+        kid = (
+            xml.findtext("KID")  # v4.0.0.0
+            or first_or_none(xml.xpath("PROTECTINFO/KID/@VALUE"))  # v4.1.0.0
+            or first_or_none(xml.xpath("PROTECTINFO/KIDS/KID/@VALUE"))  # v4.3.0.0 - can be multiple?
+        )
     #print(uuid.UUID(bytes_le=base64.decode(kid)).bytes)
 
     init_data = WidevineCencHeader()